@@ -5,15 +5,176 @@ Three-stage approach for robust name extraction from business emails
 """
 
 import re
+import json
 import os
-from typing import List, Dict, Tuple, Optional
+import functools
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, NamedTuple, Tuple, Optional
 from dataclasses import dataclass
+import ahocorasick
 from openai import OpenAI
 from dotenv import load_dotenv
 
+try:
+    import re2
+except ImportError:
+    re2 = None
+
 load_dotenv()
 
-@dataclass
+# Emails validated at once by extract_name_batch (bounds concurrent OpenAI requests)
+BATCH_WORKERS = 4
+
+# NER candidates kept per email; the LLM only ever sees the top 5
+MAX_NER_CANDIDATES = 10
+
+
+# Everything Python's Unicode \s matches (NBSP from pasted emails, \v, ...), spelled
+# out for RE2, whose \s is only [\t\n\f\r ]
+_RE2_WHITESPACE = r'\t-\r\x{1c}-\x{20}\x{85}\x{a0}\x{1680}\x{2000}-\x{200a}\x{2028}\x{2029}\x{202f}\x{205f}\x{3000}'
+
+
+def _re2_unicode_whitespace(pattern: str) -> str:
+    """Rewrite each \\s in a pattern as the explicit whitespace class, inside or outside []"""
+    parts = []
+    in_class = False
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\':
+            escape = pattern[i:i + 2]
+            if escape == r'\s':
+                parts.append(_RE2_WHITESPACE if in_class else '[' + _RE2_WHITESPACE + ']')
+            else:
+                parts.append(escape)
+            i += 2
+            continue
+        if char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        parts.append(char)
+        i += 1
+    return ''.join(parts)
+
+
+def _compile_zone_pattern(pattern: str, zone_type: str):
+    """Compile a zone pattern, using RE2 for the backtracking-prone delegation scan"""
+    # The delegation name precedes its verb, so `re` starts a bounded backtrack at
+    # almost every letter; RE2 matches it in linear time with the same results
+    # once its ASCII-only \s is widened to Unicode whitespace
+    if zone_type == 'delegation' and re2 is not None:
+        return re2.compile('(?im)' + _re2_unicode_whitespace(pattern))
+    return re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+
+
+# Zone detection patterns as (pattern, zone type, confidence, keywords), compiled once
+# at import. A pattern can only match if one of its keywords appears in the casefolded
+# text, so patterns whose zone cannot occur are skipped without running the regex
+_ZONE_PATTERNS = tuple(
+    (_compile_zone_pattern(pattern, zone_type), zone_type, confidence, keywords)
+    for pattern, zone_type, confidence, keywords in [
+        # Signature zones (high confidence)
+        (r'(saludos[^\n]*(?:\n[^\n]*){0,3})', 'signature_saludos', 0.9, ('saludos',)),
+        (r'(atentamente[^\n]*(?:\n[^\n]*){0,3})', 'signature_atentamente', 0.9, ('atentamente',)),
+        (r'(gracias[^\n]*(?:\n[^\n]*){0,3})', 'signature_gracias', 0.8, ('gracias',)),
+        (r'(cordialmente[^\n]*(?:\n[^\n]*){0,3})', 'signature_cordialmente', 0.9, ('cordialmente',)),
+
+        # Contact instruction zones (medium-high confidence)
+        (r'(contacto?[:\s]+[^\n.]{5,50})', 'contact_instruction', 0.8, ('contact',)),
+        (r'(favor\s+de\s+contactar[^\n.]{5,50})', 'contact_request', 0.8, ('favor',)),
+        (r'(comunicarse\s+con[^\n.]{5,50})', 'contact_request', 0.8, ('comunicarse',)),
+        (r'(llamar\s+a[^\n.]{5,50})', 'contact_request', 0.7, ('llamar',)),
+        (r'(dirigirse\s+a[^\n.]{5,50})', 'contact_request', 0.7, ('dirigirse',)),
+
+        # Introduction zones (medium confidence)
+        (r'(soy\s+[^\n.]{3,30})', 'self_introduction', 0.7, ('soy',)),
+        (r'(me\s+llamo\s+[^\n.]{3,30})', 'self_introduction', 0.8, ('llamo',)),
+        (r'(mi\s+nombre\s+es\s+[^\n.]{3,30})', 'self_introduction', 0.8, ('nombre',)),
+
+        # Delegation zones (medium confidence)
+        (r'([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü\s]{5,40}\s+(?:se\s+encargará|manejará|atenderá))', 'delegation', 0.6, ('encargará', 'manejará', 'atenderá')),
+
+        # Email signature blocks (catch-all, lower confidence)
+        (r'(\n[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü\s]{5,40}\n(?:[^\n]*(?:tel|email|whatsapp|phone)[^\n]*\n?){1,3})', 'email_signature', 0.6, ('tel', 'email', 'whatsapp', 'phone')),
+    ]
+)
+
+# Refined name patterns for Spanish business context, used when NER is not available
+_NAME_PATTERNS = tuple(
+    (re.compile(pattern, re.IGNORECASE), confidence)
+    for pattern, confidence in [
+        # After greetings (high confidence)
+        (r'(?:saludos|atentamente|gracias|cordialmente)[,\s]*([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.9),
+
+        # Contact patterns (medium-high confidence)
+        (r'contacto?[:\s]+([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
+        (r'favor\s+de\s+contactar\s+a?\s*([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
+        (r'comunicarse\s+con\s+([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
+
+        # Introduction patterns (medium confidence)
+        (r'(?:soy|me\s+llamo|mi\s+nombre\s+es)\s+([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
+
+        # Names before contact info (medium confidence)
+        (r'([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})(?=\s*(?:whatsapp|tel|email|phone|\+\d))', 0.7),
+
+        # Generic Spanish name patterns (lower confidence)
+        (r'\b([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+)\b', 0.5),
+    ]
+)
+
+# Common non-name words that disqualify a name candidate. Matched as substrings, so
+# compound company names such as 'Maquilogistics' are caught too
+_CANDIDATE_EXCLUDE_WORDS = frozenset({
+    'días', 'kg', 'euro', 'precio', 'toneladas', 'total', 'aproximadamente',
+    'presupuesto', 'cotización', 'maquinas', 'envio', 'urgente', 'seguro',
+    'fabrica', 'cliente', 'esperando', 'whatsapp', 'tel', 'email', 'company',
+    'empresa', 'logistics', 'transporte', 'valencia', 'madrid', 'barcelona',
+    'santos', 'brasil', 'spain', 'españa', 'mañana', 'hoy', 'ayer',
+    'gracias', 'saludos', 'atentamente', 'contacto', 'favor', 'llamar',
+    'phone', 'móvil', 'celular'
+})
+
+
+def _build_exclude_automaton(words) -> ahocorasick.Automaton:
+    """Build Aho-Corasick automaton that finds any exclude word in one pass"""
+    automaton = ahocorasick.Automaton()
+    for word in words:
+        automaton.add_word(word, word)
+    automaton.make_automaton()
+    return automaton
+
+
+_CANDIDATE_EXCLUDE_AC = _build_exclude_automaton(_CANDIDATE_EXCLUDE_WORDS)
+
+# System prompt for LLM name selection; candidates are sent as a JSON list of [text, zone]
+_NAME_PICK_PROMPT = (
+    'From name candidates found in a Spanish RFQ email, pick the most likely full personal '
+    'name (first + last, Title Case), preferring signature and contact zones. Company names, '
+    'places and job titles are not names. Reply as JSON: {"name": "<name>"} or {"name": null}.'
+)
+
+# spaCy components not needed for entity recognition
+_SPACY_DISABLED = ["parser", "tagger", "morphologizer", "lemmatizer", "attribute_ruler", "senter"]
+
+
+@functools.lru_cache(maxsize=2)
+def _load_spacy_model(name: str):
+    """Load a spaCy model once per process so every extractor shares it"""
+    import spacy
+    return spacy.load(name, disable=_SPACY_DISABLED)
+
+
+class Zone(NamedTuple):
+    """A region of the email likely to contain a name"""
+    text: str
+    type: str  # "signature_saludos", "contact_request", "delegation", etc.
+    confidence: float
+    start: int
+    end: int
+
+@dataclass(frozen=True, slots=True)
 class NameCandidate:
     """A potential name found by regex or NER"""
     text: str
@@ -29,6 +190,7 @@ class HybridNameExtractor:
         """Initialize with spaCy NER and OpenAI client"""
         self.openai_client = self._init_openai()
         self.nlp = self._init_spacy()
+        self._llm_pick = functools.lru_cache(maxsize=1024)(self._ask_llm_for_name)
 
     def _init_openai(self) -> Optional[OpenAI]:
         """Initialize OpenAI client"""
@@ -40,203 +202,126 @@ class HybridNameExtractor:
     def _init_spacy(self):
         """Initialize spaCy Spanish NER model"""
         try:
-            import spacy
-            return spacy.load("es_core_news_md")
+            # The small model's NER is close to md's and loads without the large vector
+            # table; md is still used when it is the only Spanish model installed
+            try:
+                return _load_spacy_model("es_core_news_sm")
+            except OSError:
+                return _load_spacy_model("es_core_news_md")
         except Exception as e:
             print(f"Warning: Could not load spaCy Spanish model: {e}")
             try:
-                import spacy
-                return spacy.load("xx_ent_wiki_sm")  # fallback multilingual
+                return _load_spacy_model("xx_ent_wiki_sm")  # fallback multilingual
             except:
                 print("Warning: No spaCy model available, using regex only")
                 return None
 
-    def detect_name_zones(self, text: str) -> List[Dict[str, str]]:
+    def detect_name_zones(self, text: str) -> List[Zone]:
         """
         Stage 1: Use regex/heuristics to detect candidate name zones
         Returns list of zones with their type and text content
         """
         zones = []
-        text_lower = text.lower()
-
-        # Define zone detection patterns with their types
-        zone_patterns = [
-            # Signature zones (high confidence)
-            {
-                'pattern': r'(saludos[^\n]*(?:\n[^\n]*){0,3})',
-                'type': 'signature_saludos',
-                'confidence': 0.9
-            },
-            {
-                'pattern': r'(atentamente[^\n]*(?:\n[^\n]*){0,3})',
-                'type': 'signature_atentamente',
-                'confidence': 0.9
-            },
-            {
-                'pattern': r'(gracias[^\n]*(?:\n[^\n]*){0,3})',
-                'type': 'signature_gracias',
-                'confidence': 0.8
-            },
-            {
-                'pattern': r'(cordialmente[^\n]*(?:\n[^\n]*){0,3})',
-                'type': 'signature_cordialmente',
-                'confidence': 0.9
-            },
-
-            # Contact instruction zones (medium-high confidence)
-            {
-                'pattern': r'(contacto?[:\s]+[^\n.]{5,50})',
-                'type': 'contact_instruction',
-                'confidence': 0.8
-            },
-            {
-                'pattern': r'(favor\s+de\s+contactar[^\n.]{5,50})',
-                'type': 'contact_request',
-                'confidence': 0.8
-            },
-            {
-                'pattern': r'(comunicarse\s+con[^\n.]{5,50})',
-                'type': 'contact_request',
-                'confidence': 0.8
-            },
-            {
-                'pattern': r'(llamar\s+a[^\n.]{5,50})',
-                'type': 'contact_request',
-                'confidence': 0.7
-            },
-            {
-                'pattern': r'(dirigirse\s+a[^\n.]{5,50})',
-                'type': 'contact_request',
-                'confidence': 0.7
-            },
-
-            # Introduction zones (medium confidence)
-            {
-                'pattern': r'(soy\s+[^\n.]{3,30})',
-                'type': 'self_introduction',
-                'confidence': 0.7
-            },
-            {
-                'pattern': r'(me\s+llamo\s+[^\n.]{3,30})',
-                'type': 'self_introduction',
-                'confidence': 0.8
-            },
-            {
-                'pattern': r'(mi\s+nombre\s+es\s+[^\n.]{3,30})',
-                'type': 'self_introduction',
-                'confidence': 0.8
-            },
-
-            # Delegation zones (medium confidence)
-            {
-                'pattern': r'([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü\s]{5,40}\s+(?:se\s+encargará|manejará|atenderá))',
-                'type': 'delegation',
-                'confidence': 0.6
-            },
-
-            # Email signature blocks (catch-all, lower confidence)
-            {
-                'pattern': r'(\n[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü\s]{5,40}\n(?:[^\n]*(?:tel|email|whatsapp|phone)[^\n]*\n?){1,3})',
-                'type': 'email_signature',
-                'confidence': 0.6
-            }
-        ]
+        text_folded = text.casefold()
 
         # Extract zones
-        for pattern_info in zone_patterns:
-            matches = re.finditer(pattern_info['pattern'], text, re.IGNORECASE | re.MULTILINE)
-            for match in matches:
+        for pattern, zone_type, zone_confidence, keywords in _ZONE_PATTERNS:
+            if not any(keyword in text_folded for keyword in keywords):
+                continue
+            for match in pattern.finditer(text):
                 zone_text = match.group(1).strip()
                 if zone_text and len(zone_text) > 3:
-                    zones.append({
-                        'text': zone_text,
-                        'type': pattern_info['type'],
-                        'confidence': pattern_info['confidence'],
-                        'start': match.start(),
-                        'end': match.end()
-                    })
+                    zones.append(Zone(zone_text, zone_type, zone_confidence, match.start(), match.end()))
 
         # Sort by confidence and position (prefer end of email for signatures)
-        zones.sort(key=lambda x: (x['confidence'], x['start']), reverse=True)
+        zones.sort(key=lambda x: (x.confidence, x.start), reverse=True)
 
         return zones
 
-    def extract_ner_candidates(self, zones: List[Dict]) -> List[NameCandidate]:
+    def extract_ner_candidates(self, zones: List[Zone]) -> List[NameCandidate]:
         """
         Stage 2: Apply NER to detected zones to find PERSON entities
         """
-        candidates = []
-
         if not self.nlp:
             # Fallback to simple regex if no NER available
             return self.extract_regex_fallback_candidates(zones)
 
-        for zone in zones:
-            zone_text = zone['text']
+        # Candidates arrive in zone-confidence order, so stopping early keeps the best ones
+        # and spares NER on the remaining low-confidence zones
+        return list(itertools.islice(self._iter_ner_candidates(zones), MAX_NER_CANDIDATES))
+
+    def _iter_ner_candidates(self, zones: List[Zone]) -> Iterator[NameCandidate]:
+        """Lazily run NER over zones in small batches, yielding PERSON candidates"""
+        zones = self._unique_zones(zones)
+        docs = self.nlp.pipe((zone.text for zone in zones), batch_size=8)
+        for zone, doc in zip(zones, docs):
+            yield from self._person_candidates(zone, doc)
+
+    def _ner_candidates_batch(self, zone_lists: List[List[Zone]]) -> List[List[NameCandidate]]:
+        """Run NER over the zones of several emails in a single nlp.pipe pass"""
+        zones_to_scan = [
+            (email_idx, zone)
+            for email_idx, zones in enumerate(zone_lists)
+            for zone in self._unique_zones(zones)
+        ]
+        candidate_lists = [[] for _ in zone_lists]
 
-            # Apply NER to the zone
-            doc = self.nlp(zone_text)
+        docs = self.nlp.pipe((zone.text for _, zone in zones_to_scan), batch_size=64)
+        for (email_idx, zone), doc in zip(zones_to_scan, docs):
+            candidate_lists[email_idx].extend(self._person_candidates(zone, doc))
 
-            for ent in doc.ents:
-                if ent.label_ == "PERSON" or ent.label_ == "PER":  # Person entities
-                    name_text = ent.text.strip()
+        return [candidates[:MAX_NER_CANDIDATES] for candidates in candidate_lists]
 
-                    # Basic validation
-                    if self._is_valid_name_candidate(name_text):
-                        confidence = zone['confidence'] * 0.9  # NER found person in zone
-                        candidates.append(NameCandidate(
-                            text=name_text,
-                            confidence=confidence,
-                            method="ner",
-                            zone_type=zone['type'],
-                            context=zone_text
-                        ))
-
-        return candidates
-
-    def extract_regex_fallback_candidates(self, zones: List[Dict]) -> List[NameCandidate]:
+    def _unique_zones(self, zones: List[Zone]) -> List[Zone]:
+        """Drop zones whose text is already inside a higher-confidence zone"""
+        # Zones are sorted by confidence, so a zone whose text is already inside a kept
+        # zone (e.g. a signature block also matched by the saludos pattern) adds no new
+        # entities, only lower-confidence duplicates
+        unique_zones = []
+        for zone in zones:
+            if not any(zone.text in kept.text for kept in unique_zones):
+                unique_zones.append(zone)
+        return unique_zones
+
+    def _person_candidates(self, zone: Zone, doc) -> Iterator[NameCandidate]:
+        """Yield valid PERSON entities from a zone's NER doc as candidates"""
+        for ent in doc.ents:
+            if ent.label_ == "PERSON" or ent.label_ == "PER":  # Person entities
+                name_text = ent.text.strip()
+
+                # Basic validation
+                if self._is_valid_name_candidate(name_text):
+                    confidence = zone.confidence * 0.9  # NER found person in zone
+                    yield NameCandidate(
+                        text=name_text,
+                        confidence=confidence,
+                        method="ner",
+                        zone_type=zone.type,
+                        context=zone.text
+                    )
+
+    def extract_regex_fallback_candidates(self, zones: List[Zone]) -> List[NameCandidate]:
         """
         Fallback regex-based candidate extraction when NER is not available
         """
         candidates = []
 
-        # Refined name patterns for Spanish business context
-        name_patterns = [
-            # After greetings (high confidence)
-            (r'(?:saludos|atentamente|gracias|cordialmente)[,\s]*([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.9),
-
-            # Contact patterns (medium-high confidence)
-            (r'contacto?[:\s]+([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
-            (r'favor\s+de\s+contactar\s+a?\s*([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
-            (r'comunicarse\s+con\s+([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
-
-            # Introduction patterns (medium confidence)
-            (r'(?:soy|me\s+llamo|mi\s+nombre\s+es)\s+([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})', 0.8),
-
-            # Names before contact info (medium confidence)
-            (r'([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+(?:\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+){1,3})(?=\s*(?:whatsapp|tel|email|phone|\+\d))', 0.7),
-
-            # Generic Spanish name patterns (lower confidence)
-            (r'\b([A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+\s+[A-ZÁÉÍÓÚÑÜ][a-záéíóúñü]+)\b', 0.5)
-        ]
-
         for zone in zones:
-            zone_text = zone['text']
+            zone_text = zone.text
 
-            for pattern, pattern_confidence in name_patterns:
-                matches = re.finditer(pattern, zone_text, re.IGNORECASE)
-                for match in matches:
+            for pattern, pattern_confidence in _NAME_PATTERNS:
+                for match in pattern.finditer(zone_text):
                     name_text = match.group(1).strip()
 
                     if self._is_valid_name_candidate(name_text):
                         # Combine zone confidence with pattern confidence
-                        combined_confidence = zone['confidence'] * pattern_confidence
+                        combined_confidence = zone.confidence * pattern_confidence
 
                         candidates.append(NameCandidate(
                             text=name_text,
                             confidence=combined_confidence,
                             method="zone_regex",
-                            zone_type=zone['type'],
+                            zone_type=zone.type,
                             context=zone_text
                         ))
 
@@ -248,18 +333,7 @@ class HybridNameExtractor:
             return False
 
         # Exclude common non-name words
-        exclude_words = {
-            'días', 'kg', 'euro', 'precio', 'toneladas', 'total', 'aproximadamente',
-            'presupuesto', 'cotización', 'maquinas', 'envio', 'urgente', 'seguro',
-            'fabrica', 'cliente', 'esperando', 'whatsapp', 'tel', 'email', 'company',
-            'empresa', 'logistics', 'transporte', 'valencia', 'madrid', 'barcelona',
-            'santos', 'brasil', 'spain', 'españa', 'mañana', 'hoy', 'ayer',
-            'gracias', 'saludos', 'atentamente', 'contacto', 'favor', 'llamar',
-            'phone', 'móvil', 'celular'
-        }
-
-        name_lower = name.lower()
-        if any(word in name_lower for word in exclude_words):
+        for _ in _CANDIDATE_EXCLUDE_AC.iter(name.lower()):
             return False
 
         # Must have reasonable letter-to-number ratio
@@ -294,49 +368,25 @@ class HybridNameExtractor:
             best_candidate = max(candidates, key=lambda x: x.confidence)
             return best_candidate.text
 
-        # Prepare candidates for LLM validation
-        candidate_list = []
-        for i, candidate in enumerate(candidates[:5]):  # Limit to top 5
-            candidate_list.append(f"{i+1}. {candidate.text} (found in {candidate.zone_type}, confidence: {candidate.confidence:.2f})")
-
-        if not candidate_list:
-            return None
-
-        candidates_text = "\n".join(candidate_list)
-
-        prompt = f"""You are an expert at identifying personal names in Spanish business emails.
-
-From the following candidates extracted from an RFQ email, select the MOST LIKELY full human personal name.
-
-CANDIDATES:
-{candidates_text}
-
-SELECTION CRITERIA:
-- Must be a complete personal name (first + last name)
-- Should be properly formatted (Title Case)
-- Exclude company names, job titles, or technical terms
-- Prefer names from signature sections or contact instructions
-- Spanish names typically have 2-4 words (Nombre + Apellido(s))
-
-Return ONLY the best personal name, or "NONE" if no valid personal name exists.
-
-Examples of GOOD responses: "Juan Martinez", "María José García", "Carlos López Mendez"
-Examples of BAD responses: "Logistics SL", "Contacto", "Valencia", "Manager"
+        # Skip the LLM round trip when one high-confidence name clearly dominates
+        best_candidate = max(candidates, key=lambda x: x.confidence)
+        runner_up = max((c.confidence for c in candidates if c.text != best_candidate.text), default=0.0)
+        if (best_candidate.confidence >= 0.75 and best_candidate.confidence - runner_up >= 0.1
+                and self._is_valid_name_candidate(best_candidate.text)):
+            return best_candidate.text
 
-Best personal name:"""
+        # Prepare top 5 candidates for LLM validation as a compact JSON list
+        candidates_json = json.dumps(
+            [[candidate.text, candidate.zone_type] for candidate in candidates[:5]],
+            ensure_ascii=False
+        )
 
         try:
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=50,
-                temperature=0.1
-            )
-
-            result = response.choices[0].message.content.strip()
+            # Identical candidate lists (same signature block) reuse the earlier answer
+            result = self._llm_pick(candidates_json)
 
             # Validate LLM response
-            if result and result != "NONE" and self._is_valid_name_candidate(result):
+            if result and self._is_valid_name_candidate(result):
                 return result
             else:
                 # LLM couldn't validate, fall back to highest confidence
@@ -349,20 +399,52 @@ Best personal name:"""
             best_candidate = max(candidates, key=lambda x: x.confidence)
             return best_candidate.text if best_candidate.confidence > 0.5 else None
 
+    def _ask_llm_for_name(self, candidates_json: str) -> Optional[str]:
+        """Ask the LLM to pick the best personal name from a JSON list of [candidate, zone]"""
+        response = self.openai_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            response_format={"type": "json_object"},
+            messages=[
+                {"role": "system", "content": _NAME_PICK_PROMPT},
+                {"role": "user", "content": candidates_json}
+            ],
+            max_tokens=30,
+            temperature=0
+        )
+        name = json.loads(response.choices[0].message.content).get("name")
+        return name.strip() if isinstance(name, str) else None
+
     def extract_name(self, text: str) -> Dict[str, any]:
         """
         Main extraction method: combines all three stages
         Returns dict with name, confidence, method, and debug info
         """
         # Stage 1: Detect name zones
+        zones, skipped = self._detect_zones_or_skip(text)
+        if skipped:
+            return skipped
+
+        # Stage 2: Extract NER candidates from zones
+        candidates = self.extract_ner_candidates(zones)
+
+        return self._select_name(zones, candidates)
+
+    def _detect_zones_or_skip(self, text: str) -> Tuple[List[Zone], Optional[Dict]]:
+        """Detect name zones, or return the empty result when no name can be found"""
+        # Accepted names start each word with a capital, so all-lowercase text cannot
+        # yield one; bail out before zone detection, NER or the LLM run
+        if text.islower():
+            return [], {"name": "", "confidence": 0.0, "method": "no_capitals", "debug": {"zones": []}}
+
         zones = self.detect_name_zones(text)
 
         if not zones:
-            return {"name": "", "confidence": 0.0, "method": "no_zones", "debug": {"zones": []}}
+            return [], {"name": "", "confidence": 0.0, "method": "no_zones", "debug": {"zones": []}}
 
-        # Stage 2: Extract NER candidates from zones
-        candidates = self.extract_ner_candidates(zones)
+        return zones, None
 
+    def _select_name(self, zones: List[Zone], candidates: List[NameCandidate]) -> Dict[str, any]:
+        """Validate the candidates and build the extract_name result"""
         if not candidates:
             return {"name": "", "confidence": 0.0, "method": "no_candidates", "debug": {"zones": zones}}
 
@@ -389,6 +471,19 @@ Best personal name:"""
             }
         }
 
+    def extract_name_batch(self, texts: List[str]) -> List[Dict[str, any]]:
+        """Extract names from several emails concurrently so their LLM round trips overlap"""
+        with ThreadPoolExecutor(max_workers=BATCH_WORKERS, thread_name_prefix='name-batch') as batch_pool:
+            if not self.nlp:
+                return list(batch_pool.map(self.extract_name, texts))
+
+            # Run NER for every email's zones in one nlp.pipe call, then validate in parallel
+            staged = [self._detect_zones_or_skip(text) for text in texts]
+            zone_lists = [zones for zones, skipped in staged if not skipped]
+            candidate_lists = self._ner_candidates_batch(zone_lists)
+            selected = batch_pool.map(self._select_name, zone_lists, candidate_lists)
+            return [skipped or next(selected) for _, skipped in staged]
+
 # Test the hybrid extractor
 if __name__ == "__main__":
     extractor = HybridNameExtractor()
@@ -436,7 +531,10 @@ WhatsApp: +34 666 123 456
 Maquilogistics SL
 valencia
 
-PD: algunas maquinas tienen aceite residual pero ya las limpiamos"""
+PD: algunas maquinas tienen aceite residual pero ya las limpiamos""",
+
+        # Test case 5: Delegation with non-breaking space and vertical tab (pasted email)
+        "Hola equipo,\nJuan\xa0Pérez se\vencargará del envío a Santos."
     ]
 
     for i, email in enumerate(test_emails, 1):
@@ -7,21 +7,20 @@ import streamlit as st
 import pandas as pd
 import re
 import os
-import smtplib
+import copy
+import json
+import hashlib
 import tempfile
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Dict, List
+from typing import TYPE_CHECKING, Dict, List
 
 from advanced_extractor import AdvancedRFQExtractor
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.units import inch
+
+if TYPE_CHECKING:
+    import smtplib
+    from email.mime.base import MIMEBase
 
 st.set_page_config(
     page_title="Smart RFQ Extractor",
@@ -39,16 +38,39 @@ def get_extractor():
 
 extractor = get_extractor()
 
-def create_pdf_quote(extraction_results: Dict, quote_options: List[Dict]) -> str:
-    """Generate professional PDF quotation"""
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_file:
-        pdf_path = tmp_file.name
+# First integer in the extracted weight string, used for pricing
+_WEIGHT_NUM_RE = re.compile(r'\d+')
 
-    doc = SimpleDocTemplate(pdf_path, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
+# Route and commodity keywords that change the pricing tier
+_INTERCONT_RE = re.compile(r'brasil|brazil|america|usa|asia', re.IGNORECASE)
+_MACHINERY_RE = re.compile(r'maquina', re.IGNORECASE)
+
+def quote_prices(weight_kg: int, is_intercontinental: bool, is_urgent: bool, is_machinery: bool) -> tuple:
+    """Air, sea LCL and sea FCL 20ft prices in EUR for one shipment"""
+    # Calculate realistic prices
+    if is_intercontinental:
+        air_rate = 8.5 if not is_urgent else 12.0
+        sea_fcl_base = 2800
+    else:
+        air_rate = 3.2 if not is_urgent else 4.5
+        sea_fcl_base = 1200
+
+    heavy_premium = 1.3 if is_machinery else 1.0
 
-    # Custom styles
+    air_price = (weight_kg * air_rate + 450) * heavy_premium
+    sea_lcl_price = max(680, weight_kg * 0.4 * heavy_premium) if is_intercontinental else max(290, weight_kg * 0.3)
+    fcl_price = sea_fcl_base * heavy_premium
+    return air_price, sea_lcl_price, fcl_price
+
+# PDF styles are identical for every quote; ReportLab is imported on first use
+# so sessions that never build a PDF skip it
+@st.cache_resource
+def _pdf_styles():
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+    from reportlab.lib import colors
+
+    styles = getSampleStyleSheet()
     title_style = ParagraphStyle(
         'CustomTitle',
         parent=styles['Heading1'],
@@ -56,29 +78,91 @@ def create_pdf_quote(extraction_results: Dict, quote_options: List[Dict]) -> str
         spaceAfter=30,
         textColor=colors.darkblue
     )
+    details_tstyle = TableStyle([
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    options_tstyle = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), 9),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    return styles, title_style, details_tstyle, options_tstyle
 
-    # Header
-    story.append(Paragraph("COTIZACIÓN DE TRANSPORTE INTERNACIONAL", title_style))
-    story.append(Spacer(1, 20))
-
-    # Company info
-    company_info = """
+# Static PDF text; Paragraphs keep layout state, so they are still built per quote
+_COMPANY_INFO = """
     <b>IBERLOGISTICS S.L.</b><br/>
     C/ Gran Vía 123, 28013 Madrid<br/>
     Tel: +34 91 123 4567 | Email: quotes@iberlogistics.es<br/>
     CIF: B12345678
     """
-    story.append(Paragraph(company_info, styles['Normal']))
+_TERMS = """
+    <b>TÉRMINOS Y CONDICIONES:</b><br/>
+    • Precios válidos por 15 días<br/>
+    • Sujeto a disponibilidad de espacio<br/>
+    • Documentación requerida: factura comercial, packing list<br/>
+    • Seguro de mercancías opcional (2% del valor CIF)<br/>
+    • Tiempos de tránsito aproximados, no garantizados<br/>
+    • Aplican términos FIATA estándar<br/>
+    • Cotización generada automáticamente con IA avanzada
+    """
+
+def create_pdf_quote(extraction_results: Dict, quote_options: List[Dict]) -> str:
+    """Generate professional PDF quotation"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+    from reportlab.lib.units import inch
+
+    # Identical inputs on the same day reuse the PDF already on disk. The reference
+    # is derived from the same date and hash, so a cached PDF never shows a stale one
+    now = datetime.now()
+    day = now.strftime('%Y%m%d')
+    key = hashlib.blake2b(
+        json.dumps([extraction_results, quote_options, day], sort_keys=True, default=str).encode(),
+        digest_size=16
+    ).hexdigest()
+    reference = f"QT-{day}-{key[:6].upper()}"
+    pdf_path = os.path.join(tempfile.gettempdir(), f"rfq_quote_{key}.pdf")
+    if os.path.exists(pdf_path):
+        return pdf_path
+
+    styles, title_style, details_tstyle, options_tstyle = _pdf_styles()
+
+    # Build next to the final path and rename, so a concurrent session never sees a partial file
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf', dir=tempfile.gettempdir()) as tmp_file:
+        build_path = tmp_file.name
+
+    doc = SimpleDocTemplate(build_path, pagesize=A4)
+    story = []
+
+    # Header
+    story.append(Paragraph("COTIZACIÓN DE TRANSPORTE INTERNACIONAL", title_style))
+    story.append(Spacer(1, 20))
+
+    # Company info
+    story.append(Paragraph(_COMPANY_INFO, styles['Normal']))
     story.append(Spacer(1, 20))
 
     # Quote details
-    quote_date = datetime.now().strftime("%d/%m/%Y")
-    validity = (datetime.now() + timedelta(days=15)).strftime("%d/%m/%Y")
+    quote_date = now.strftime("%d/%m/%Y")
+    validity = (now + timedelta(days=15)).strftime("%d/%m/%Y")
 
     quote_info = f"""
     <b>Fecha de cotización:</b> {quote_date}<br/>
     <b>Válida hasta:</b> {validity}<br/>
-    <b>Referencia:</b> QT-{datetime.now().strftime('%Y%m%d-%H%M')}<br/>
+    <b>Referencia:</b> {reference}<br/>
     <b>Confianza de extracción:</b> {extraction_results.get('extraction_confidence', 0):.1%}
     """
     story.append(Paragraph(quote_info, styles['Normal']))
@@ -87,106 +171,65 @@ def create_pdf_quote(extraction_results: Dict, quote_options: List[Dict]) -> str
     # Shipment details
     story.append(Paragraph("<b>DETALLES DEL ENVÍO</b>", styles['Heading2']))
 
-    shipment_details = [
-        ['Mercancía:', extraction_results.get('commodity', 'No especificada')],
-        ['Origen:', extraction_results.get('origin', 'No especificado')],
-        ['Destino:', extraction_results.get('destination', 'No especificado')],
-        ['Peso:', extraction_results.get('weight', 'No especificado')],
-        ['Urgencia:', extraction_results.get('urgency', 'Normal').title()],
-        ['Contacto:', extraction_results.get('contact_name', 'No especificado')],
-        ['Teléfono:', extraction_results.get('contact_info', 'No especificado')]
-    ]
+    shipment_details = (
+        ('Mercancía:', extraction_results.get('commodity', 'No especificada')),
+        ('Origen:', extraction_results.get('origin', 'No especificado')),
+        ('Destino:', extraction_results.get('destination', 'No especificado')),
+        ('Peso:', extraction_results.get('weight', 'No especificado')),
+        ('Urgencia:', extraction_results.get('urgency', 'Normal').title()),
+        ('Contacto:', extraction_results.get('contact_name', 'No especificado')),
+        ('Teléfono:', extraction_results.get('contact_info', 'No especificado'))
+    )
 
     details_table = Table(shipment_details, colWidths=[2*inch, 4*inch])
-    details_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    details_table.setStyle(details_tstyle)
     story.append(details_table)
     story.append(Spacer(1, 30))
 
     # Options table
     story.append(Paragraph("<b>OPCIONES DE TRANSPORTE</b>", styles['Heading2']))
 
-    options_data = [['Servicio', 'Precio', 'Tiempo Tránsito', 'Ruta', 'Recomendado Para']]
-    for option in quote_options:
-        options_data.append([
-            option['Service'],
-            option['Price'],
-            option['Transit Time'],
-            option['Route'],
-            option['Best For']
-        ])
+    options_data = (('Servicio', 'Precio', 'Tiempo Tránsito', 'Ruta', 'Recomendado Para'),) + tuple(
+        (option['Service'], option['Price'], option['Transit Time'], option['Route'], option['Best For'])
+        for option in quote_options
+    )
 
     options_table = Table(options_data, colWidths=[1.5*inch, 1*inch, 1*inch, 1.5*inch, 1.5*inch])
-    options_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 9),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    options_table.setStyle(options_tstyle)
     story.append(options_table)
     story.append(Spacer(1, 30))
 
     # Terms and conditions
-    terms = """
-    <b>TÉRMINOS Y CONDICIONES:</b><br/>
-    • Precios válidos por 15 días<br/>
-    • Sujeto a disponibilidad de espacio<br/>
-    • Documentación requerida: factura comercial, packing list<br/>
-    • Seguro de mercancías opcional (2% del valor CIF)<br/>
-    • Tiempos de tránsito aproximados, no garantizados<br/>
-    • Aplican términos FIATA estándar<br/>
-    • Cotización generada automáticamente con IA avanzada
-    """
-    story.append(Paragraph(terms, styles['Normal']))
+    story.append(Paragraph(_TERMS, styles['Normal']))
 
     # Build PDF
     doc.build(story)
+    os.replace(build_path, pdf_path)
     return pdf_path
 
-def draft_spanish_email(extraction_results: Dict, quote_options: List[Dict]) -> str:
-    """Generate professional follow-up email in Spanish"""
-    contact_name = extraction_results.get('contact_name', 'Estimado/a cliente')
-    if not contact_name or contact_name == "❌ Not found":
-        contact_name = 'Estimado/a cliente'
-
-    commodity = extraction_results.get('commodity', 'su mercancía')
-    origin = extraction_results.get('origin', 'origen')
-    destination = extraction_results.get('destination', 'destino')
-
-    # Create options summary
-    options_text = ""
-    for i, option in enumerate(quote_options, 1):
-        options_text += f"{i}. {option['Service']}: {option['Price']} - {option['Transit Time']}\n"
+@st.cache_data(max_entries=8)
+def load_pdf_bytes(pdf_path: str, mtime: float) -> bytes:
+    """Read a generated PDF once per file version for the download button"""
+    with open(pdf_path, 'rb') as pdf_file:
+        return pdf_file.read()
 
-    email_content = f"""Asunto: Cotización transporte {origin} → {destination} - Ref: QT-{datetime.now().strftime('%Y%m%d')}
+# Follow-up email body, filled in by _render_spanish_email
+_EMAIL_TEMPLATE = """Asunto: Cotización transporte {origin} → {destination} - Ref: QT-{ref_date}
 
 {contact_name},
 
 Gracias por contactar con IberLogistics para el transporte de {commodity} desde {origin} hasta {destination}.
 
-Hemos analizado su solicitud con nuestro sistema de IA avanzado (confianza: {extraction_results.get('extraction_confidence', 0):.1%}) y adjunto encontrará nuestra cotización detallada.
+Hemos analizado su solicitud con nuestro sistema de IA avanzado (confianza: {confidence}) y adjunto encontrará nuestra cotización detallada.
 
 OPCIONES RECOMENDADAS:
-{options_text}
+{options}
 CARACTERÍSTICAS DEL ENVÍO:
 • Mercancía: {commodity}
-• Peso: {extraction_results.get('weight', 'N/A')}
-• Urgencia: {extraction_results.get('urgency', 'Normal').title()}
-• Contacto: {extraction_results.get('contact_name', 'N/A')}
-• Teléfono: {extraction_results.get('contact_info', 'N/A')}
+• Peso: {weight}
+• Urgencia: {urgency}
+• Contacto: {contact}
+• Teléfono: {phone}
 
 PRÓXIMOS PASOS:
 1. Revise las opciones adjuntas en el PDF
@@ -209,18 +252,120 @@ www.iberlogistics.es
 
 ---
 Esta cotización ha sido generada automáticamente por nuestro sistema de IA avanzada.
-Confianza de extracción: {extraction_results.get('extraction_confidence', 0):.1%}
+Confianza de extracción: {confidence}
 """
-    return email_content
+
+def draft_spanish_email(extraction_results: Dict, quote_options: List[Dict]) -> str:
+    """Generate professional follow-up email in Spanish"""
+    return _render_spanish_email(extraction_results, quote_options, datetime.now().strftime('%Y%m%d'))
+
+@st.cache_data(max_entries=32)
+def _render_spanish_email(extraction_results: Dict, quote_options: List[Dict], ref_date: str) -> str:
+    """Email body, cached because every rerun redraws it; keyed on results, options and date"""
+    contact_name = extraction_results.get('contact_name', 'Estimado/a cliente')
+    if not contact_name or contact_name == "❌ Not found":
+        contact_name = 'Estimado/a cliente'
+
+    commodity = extraction_results.get('commodity', 'su mercancía')
+    origin = extraction_results.get('origin', 'origen')
+    destination = extraction_results.get('destination', 'destino')
+
+    # Create options summary
+    options_text = "".join(
+        f"{i}. {option['Service']}: {option['Price']} - {option['Transit Time']}\n"
+        for i, option in enumerate(quote_options, 1)
+    )
+
+    return _EMAIL_TEMPLATE.format_map({
+        'origin': origin,
+        'destination': destination,
+        'commodity': commodity,
+        'contact_name': contact_name,
+        'ref_date': ref_date,
+        'options': options_text,
+        'confidence': f"{extraction_results.get('extraction_confidence', 0):.1%}",
+        'weight': extraction_results.get('weight', 'N/A'),
+        'urgency': extraction_results.get('urgency', 'Normal').title(),
+        'contact': extraction_results.get('contact_name', 'N/A'),
+        'phone': extraction_results.get('contact_info', 'N/A')
+    })
+
+# Seconds before a hung SMTP server fails the send; every session waits on _smtp_lock
+_SMTP_TIMEOUT = 30
+
+def _is_dropped_connection(error: Exception) -> bool:
+    """True if a send failed because the server closed the cached connection"""
+    import smtplib
+
+    if isinstance(error, smtplib.SMTPServerDisconnected):
+        return True
+    # An idle session timed out by the server gets 421, after which smtplib closes it
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code == 421
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return any(code == 421 for code, _ in error.recipients.values())
+    return False
+
+# smtplib connections are not thread-safe; Streamlit sessions share the cached one.
+# The lock lives in cache_resource because the script body re-executes on every rerun.
+@st.cache_resource
+def _smtp_lock() -> threading.Lock:
+    return threading.Lock()
+
+@st.cache_resource
+def get_smtp(smtp_server: str, smtp_port: int, smtp_user: str, smtp_pass: str) -> "smtplib.SMTP":
+    """Open and authenticate an SMTP connection reused across sends"""
+    import smtplib
+
+    server = smtplib.SMTP(smtp_server, smtp_port, timeout=_SMTP_TIMEOUT)
+    server.starttls()
+    server.login(smtp_user, smtp_pass)
+    return server
+
+def smtp_settings() -> tuple:
+    """SMTP server, port, user and password from the environment"""
+    return (
+        os.getenv('SMTP_SERVER', 'smtp.gmail.com'),
+        int(os.getenv('SMTP_PORT', '587')),
+        os.getenv('SMTP_USER'),
+        os.getenv('SMTP_PASS')
+    )
+
+def warm_smtp() -> None:
+    """Open the cached SMTP connection ahead of a send; errors surface on the send itself"""
+    smtp_server, smtp_port, smtp_user, smtp_pass = smtp_settings()
+    if smtp_user and smtp_pass:
+        try:
+            get_smtp(smtp_server, smtp_port, smtp_user, smtp_pass)
+        except Exception:
+            pass
+
+@st.cache_resource(max_entries=4)
+def _build_pdf_part(pdf_path: str, mtime: float, ref_date: str) -> "MIMEBase":
+    """Base64-encode a PDF attachment once per file version so resends skip the encode"""
+    from email.mime.base import MIMEBase
+    from email import encoders
+
+    with open(pdf_path, "rb") as attachment:
+        part = MIMEBase('application', 'octet-stream')
+        part.set_payload(attachment.read())
+
+    encoders.encode_base64(part)
+    part.add_header(
+        'Content-Disposition',
+        f'attachment; filename= cotizacion_smart_{ref_date}.pdf'
+    )
+    return part
 
 def send_email_with_pdf(recipient_email: str, subject: str, body: str, pdf_path: str = None) -> bool:
     """Send email with optional PDF attachment"""
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+    from email.mime.text import MIMEText
+
     try:
         # Get SMTP configuration from environment
-        smtp_server = os.getenv('SMTP_SERVER', 'smtp.gmail.com')
-        smtp_port = int(os.getenv('SMTP_PORT', '587'))
-        smtp_user = os.getenv('SMTP_USER')
-        smtp_pass = os.getenv('SMTP_PASS')
+        smtp_server, smtp_port, smtp_user, smtp_pass = smtp_settings()
 
         if not smtp_user or not smtp_pass:
             st.error("❌ SMTP credentials not configured. Please add SMTP_USER and SMTP_PASS to your .env file.")
@@ -235,26 +380,29 @@ def send_email_with_pdf(recipient_email: str, subject: str, body: str, pdf_path:
         # Add body
         msg.attach(MIMEText(body, 'plain', 'utf-8'))
 
-        # Add PDF attachment if provided
-        if pdf_path and os.path.exists(pdf_path):
-            with open(pdf_path, "rb") as attachment:
-                part = MIMEBase('application', 'octet-stream')
-                part.set_payload(attachment.read())
-
-            encoders.encode_base64(part)
-            part.add_header(
-                'Content-Disposition',
-                f'attachment; filename= cotizacion_smart_{datetime.now().strftime("%Y%m%d")}.pdf'
-            )
-            msg.attach(part)
+        # Add PDF attachment if provided; an empty file is a failed build, and the
+        # email body promises an attached quote, so refuse to send without it
+        if pdf_path:
+            if os.path.exists(pdf_path):
+                pdf_stat = os.stat(pdf_path)
+                if not pdf_stat.st_size:
+                    st.error("❌ The PDF quote is empty - please regenerate it before sending.")
+                    return False
+                part = _build_pdf_part(pdf_path, pdf_stat.st_mtime, datetime.now().strftime("%Y%m%d"))
+                msg.attach(copy.copy(part))
+            else:
+                st.warning("⚠️ PDF quote file not found - sending email without attachment")
 
-        # Send email
-        server = smtplib.SMTP(smtp_server, smtp_port)
-        server.starttls()
-        server.login(smtp_user, smtp_pass)
+        # Send email, reconnecting once if the cached connection was dropped
         text = msg.as_string()
-        server.sendmail(smtp_user, recipient_email, text)
-        server.quit()
+        with _smtp_lock():
+            try:
+                get_smtp(smtp_server, smtp_port, smtp_user, smtp_pass).sendmail(smtp_user, recipient_email, text)
+            except smtplib.SMTPException as e:
+                if not _is_dropped_connection(e):
+                    raise
+                get_smtp.clear()
+                get_smtp(smtp_server, smtp_port, smtp_user, smtp_pass).sendmail(smtp_user, recipient_email, text)
 
         return True
 
@@ -332,20 +480,16 @@ if st.session_state.extraction_results:
     confidence_color = "🟢" if confidence > 0.7 else "🟡" if confidence > 0.4 else "🔴"
     st.metric("Overall Confidence", f"{confidence:.1%}", help="How confident we are in the extraction accuracy")
 
-    # Results table
-    extraction_data = []
-    for field, value in results.items():
-        if field != 'extraction_confidence':
-            # Determine field confidence (simplified)
-            field_confidence = "High" if value and len(str(value)) > 3 else "Low" if value else "Missing"
-            extraction_data.append({
-                'Field': field.replace('_', ' ').title(),
-                'Value': value or "❌ Not found",
-                'Status': "✅ Found" if value else "❌ Missing",
-                'Confidence': field_confidence
-            })
-
-    df = pd.DataFrame(extraction_data)
+    # Results table, built column-wise
+    fields = [(field, value) for field, value in results.items() if field != 'extraction_confidence']
+    df = pd.DataFrame({
+        'Field': [field.replace('_', ' ').title() for field, _ in fields],
+        'Value': [value or "❌ Not found" for _, value in fields],
+        'Status': ["✅ Found" if value else "❌ Missing" for _, value in fields],
+        # Determine field confidence (simplified)
+        'Confidence': ["High" if value and len(str(value)) > 3 else "Low" if value else "Missing"
+                       for _, value in fields]
+    })
     st.dataframe(df, use_container_width=True)
 
     # Generate quote if we have minimum info
@@ -356,35 +500,20 @@ if st.session_state.extraction_results:
 
         # Parse weight for calculations
         weight_str = results.get('weight', '1000 kg')
-        weight_nums = re.findall(r'\d+', weight_str)
-        weight_kg = int(weight_nums[0]) if weight_nums else 1000
+        weight_match = _WEIGHT_NUM_RE.search(weight_str)
+        weight_kg = int(weight_match.group()) if weight_match else 1000
 
         # Check if intercontinental
-        is_intercontinental = any(
-            country in (results.get('origin', '') + results.get('destination', '')).lower()
-            for country in ['brasil', 'brazil', 'america', 'usa', 'asia']
-        )
+        is_intercontinental = bool(_INTERCONT_RE.search(results.get('origin', '') + results.get('destination', '')))
 
         # Check if urgent
         is_urgent = results.get('urgency', '').lower() == 'urgent'
 
-        # Calculate realistic prices
-        if is_intercontinental:
-            air_rate = 8.5 if not is_urgent else 12.0
-            sea_lcl_rate = 320
-            sea_fcl_base = 2800
-        else:
-            air_rate = 3.2 if not is_urgent else 4.5
-            sea_lcl_rate = 150
-            sea_fcl_base = 1200
-
         # Heavy machinery premium
-        is_machinery = 'maquina' in results.get('commodity', '').lower()
-        heavy_premium = 1.3 if is_machinery else 1.0
+        is_machinery = bool(_MACHINERY_RE.search(results.get('commodity', '')))
 
         # Calculate options
-        air_price = (weight_kg * air_rate + 450) * heavy_premium
-        sea_lcl_price = max(680, weight_kg * 0.4 * heavy_premium) if is_intercontinental else max(290, weight_kg * 0.3)
+        air_price, sea_lcl_price, fcl_price = quote_prices(weight_kg, is_intercontinental, is_urgent, is_machinery)
 
         quote_options = [
             {
@@ -405,7 +534,6 @@ if st.session_state.extraction_results:
 
         # Add FCL option for heavy shipments
         if weight_kg > 8000:  # ~8+ tons suggests FCL
-            fcl_price = sea_fcl_base * heavy_premium
             quote_options.append({
                 'Service': 'Sea Freight FCL 20ft',
                 'Price': f"€{fcl_price:,.0f}",
@@ -492,14 +620,14 @@ if st.session_state.extraction_results and st.session_state.quote_options:
     # Download button (separate from generation to avoid crashes)
     if st.session_state.get('pdf_generated', False) and 'pdf_path' in st.session_state:
         try:
-            with open(st.session_state.pdf_path, 'rb') as pdf_file:
-                st.download_button(
-                    label="⬇️ Download PDF Quote",
-                    data=pdf_file.read(),
-                    file_name=f"smart_quote_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                    mime="application/pdf",
-                    key="pdf_download_btn_v2"
-                )
+            pdf_path = st.session_state.pdf_path
+            st.download_button(
+                label="⬇️ Download PDF Quote",
+                data=load_pdf_bytes(pdf_path, os.path.getmtime(pdf_path)),
+                file_name=f"smart_quote_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
+                mime="application/pdf",
+                key="pdf_download_btn_v2"
+            )
         except Exception as e:
             st.error(f"❌ PDF download failed: {str(e)}")
 
@@ -548,14 +676,21 @@ if st.session_state.extraction_results and st.session_state.quote_options:
     if send_email_clicked:
         current_email = st.session_state.recipient_email
         if current_email:
-            if 'pdf_path' not in st.session_state:
-                st.warning("⚠️ No PDF generated - sending email without attachment")
-                pdf_path_to_send = None
-            else:
-                pdf_path_to_send = st.session_state.pdf_path
+            pdf_path_to_send = st.session_state.get('pdf_path')
 
             try:
                 with st.spinner("Sending email..."):
+                    if pdf_path_to_send is None:
+                        # Build the missing PDF while the SMTP login runs in the background
+                        with ThreadPoolExecutor(max_workers=1) as pool:
+                            pool.submit(warm_smtp)
+                            try:
+                                pdf_path_to_send = create_pdf_quote(results, quote_options)
+                                st.session_state.pdf_path = pdf_path_to_send
+                                st.session_state.pdf_generated = True
+                            except Exception as e:
+                                st.warning(f"⚠️ PDF generation failed ({str(e)}) - sending email without attachment")
+
                     subject = f"Cotización transporte {results.get('origin', '')} → {results.get('destination', '')}"
                     success = send_email_with_pdf(
                         current_email,